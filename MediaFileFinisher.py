@@ -1,24 +1,42 @@
 """此模块用于批量整理媒体文件。"""
 
+import os
 import sys
+import mmap
+import errno
+import shutil
 import hashlib
+import sqlite3
+import filecmp
+import queue
 import argparse
-import multiprocessing
-from multiprocessing.managers import Namespace
-from functools import partial
-from pathlib import Path, PurePath
+import threading
+from contextlib import closing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
 from datetime import datetime
-from typing import List, Tuple, Dict, Iterable, Optional, Any
+from typing import BinaryIO, List, FrozenSet, Tuple, Dict, Iterator, Optional, NamedTuple
 
 from tqdm import tqdm
 from hachoir.core import config
 from hachoir.core.log import log as logger
-from hachoir.parser import createParser
+from hachoir.parser import guessParser
+from hachoir.stream import InputIOStream
 from hachoir.metadata import extractMetadata
 
 config.quiet = True
 
 
+class RenameResult(NamedTuple):
+    """单个媒体文件的整理结果，用于汇总统计信息。"""
+
+    kind: str
+    duplicated_removed: Optional[str] = None
+    name_duplicated: Optional[str] = None
+    moved: Optional[Tuple[str, str]] = None
+
+
 class MediaFileFinisher:
     """媒体文件整理器类。"""
 
@@ -26,62 +44,294 @@ class MediaFileFinisher:
     VIDEO_SUFFIX_FILTER: Tuple = ('.mp4', '.mov', '.avi', '.dng', '.mp3', '.wmv', '.3gp')
 
     SUFFIX_FILTER: Tuple = IMAGE_SUFFIX_FILTER + VIDEO_SUFFIX_FILTER
+    SUFFIX_SET: FrozenSet[str] = frozenset(SUFFIX_FILTER)
+
+    # 后缀名到(媒体文件类型, 目的目录名前缀, 目的文件名前缀)的映射
+    SUFFIX_NAME_PREFIX: Dict[str, Tuple[str, str, str]] = {
+        **dict.fromkeys(IMAGE_SUFFIX_FILTER, ('IMAGE', 'PHOTO', 'IMG')),
+        **dict.fromkeys(VIDEO_SUFFIX_FILTER, ('VIDEO', 'VIDEO', 'VID')),
+    }
+    UNKNOWN_NAME_PREFIX: Tuple[str, str, str] = ('UNKNOWN', 'UNKNOWN', 'UNKNOWN')
+
+    # Metadata时间字符串的备选解析格式，ISO格式解析失败时依次尝试
+    DATETIME_FORMATS: Tuple = (
+        '%Y-%m-%d %H:%M:%S',
+        '%Y/%m/%d %H:%M:%S',
+        '%Y-%m-%d %H:%M:%S.%f',
+        '%Y/%m/%d %H:%M:%S.%f'
+    )
+
+    # 媒体文件创建时间缓存保存在用户缓存目录中，不写入目的目录
+    META_CACHE_DIR_NAME: str = 'MediaFileFinisher'
+    META_CACHE_FILE_NAME: str = 'meta_cache.sqlite'
+
+    # 缓存条目超过该秒数未被写入或命中时，在保存缓存时清理，避免缓存数据库无限增长
+    META_CACHE_MAX_AGE: int = 90 * 24 * 3600
+
+    # 每批提交到进程池解析创建时间的媒体文件数范围
+    MIN_BATCH_SIZE: int = 8
+    MAX_BATCH_SIZE: int = 128
+
+    # Metadata缓存指纹中参与哈希计算的文件头、文件尾字节数，以及每个进程缓存的解析结果数
+    METADATA_FINGERPRINT_SIZE: int = 4096
+    METADATA_CACHE_SIZE: int = 4096
+
+    # 文件指纹中参与哈希计算的文件头字节数
+    FINGERPRINT_PREFIX_SIZE: int = 64 * 1024
+
+    # 移动重命名日志每累积多少条输出一次
+    LOG_BATCH_SIZE: int = 1000
 
     def __init__(self, src_media_dir: str, dst_media_dir: str):
 
-        self.src_media_dir = Path(src_media_dir)
-        self.dst_media_dir = Path(dst_media_dir)
+        # 使用解析后的绝对路径，避免同一目录因写法不同(相对路径、符号链接等)而被误判为不同目录
+        self.src_media_dir = Path(src_media_dir).resolve()
+        self.dst_media_dir = Path(dst_media_dir).resolve()
+        self.meta_cache_file = self.get_meta_cache_file()
+        self.meta_cache_hits: List[Tuple[str, int, int]] = []
+        self.dst_dir_index: Dict[Path, Dict[str, str]] = {}
+        self.file_fingerprints: Dict[Path, bytes] = {}
+        self.discovered_media_file_nums = 0
 
-    def is_supported(self, src_media_file: Path) -> bool:
+    @classmethod
+    def get_meta_cache_file(cls) -> Path:
         """
-        判断是否为支持的文件类型
-        :param src_media_file: Path
-        :return: bool
+        获取媒体文件创建时间缓存数据库路径，优先使用XDG_CACHE_HOME，其次LOCALAPPDATA，最后~/.cache
+        :return: Path
         """
 
-        media_file_suffix: str = Path(src_media_file).suffix
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+        cache_dir = Path(cache_home) if cache_home else Path.joinpath(Path.home(), '.cache')
+        return Path.joinpath(cache_dir, cls.META_CACHE_DIR_NAME, cls.META_CACHE_FILE_NAME)
 
-        if src_media_file.is_file():
-            if media_file_suffix.lower() in self.SUFFIX_FILTER:
-                return True
+    def connect_meta_cache(self) -> sqlite3.Connection:
+        """
+        连接媒体文件创建时间缓存数据库，不存在则自动创建
+        :return: sqlite3.Connection
+        """
 
-        return False
+        conn = sqlite3.connect(self.meta_cache_file)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS meta_cache ('
+            'name TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, '
+            'creation_time TEXT NOT NULL, used_at INTEGER NOT NULL, '
+            'PRIMARY KEY (name, size, mtime_ns))'
+        )
+        return conn
+
+    def load_meta_cache(self) -> Optional[sqlite3.Connection]:
+        """
+        打开媒体文件创建时间缓存数据库，供遍历时按(name, size, mtime_ns)逐个查询，不把整个缓存读入内存
+        缓存数据库不存在时不创建，返回None
+        :return: sqlite3.Connection or None
+        """
 
-    def get_supported_media_file_items(self) -> List[Path]:
+        if not self.meta_cache_file.is_file():
+            return None
+
+        try:
+            return self.connect_meta_cache()
+        except sqlite3.Error as e:
+            logger.warning(f'无法加载媒体文件缓存: {e}')
+            return None
+
+    @staticmethod
+    def get_meta_cache(conn: sqlite3.Connection,
+                       meta_cache_key: Tuple[str, int, int]) -> Optional[str]:
         """
-        获取支持的媒体文件列表
-        :return: List[Path]
+        按主键查询媒体文件创建时间缓存
+        :param conn: sqlite3.Connection
+        :param meta_cache_key: Tuple of (name, size, mtime_ns)
+        :return: string or None
         """
 
-        src_media_file_items: Iterable = Path(self.src_media_dir).rglob('*')
+        try:
+            row = conn.execute(
+                'SELECT creation_time FROM meta_cache WHERE name = ? AND size = ? AND mtime_ns = ?',
+                meta_cache_key
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f'无法查询媒体文件缓存: {e}')
+            return None
+
+        return row[0] if row else None
 
-        supported_src_media_file_items: List = list(filter(self.is_supported, src_media_file_items))
+    def save_meta_cache(self, meta_cache_items: Dict[Tuple[str, int, int], str]) -> None:
+        """
+        将新增的媒体文件创建时间缓存一次性写入数据库，同时刷新命中条目的使用时间，
+        并清理超过META_CACHE_MAX_AGE未使用的条目；没有新增和命中的缓存时不创建数据库
+        :param meta_cache_items: Dict of {(name, size, mtime_ns): creation_time}
+        :return: None
+        """
 
-        return supported_src_media_file_items
+        if not meta_cache_items and not self.meta_cache_hits:
+            return
+
+        used_at = int(datetime.now().timestamp())
+        try:
+            self.meta_cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self.connect_meta_cache()) as conn:
+                with conn:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO meta_cache '
+                        '(name, size, mtime_ns, creation_time, used_at) VALUES (?, ?, ?, ?, ?)',
+                        ((*key, creation_time, used_at)
+                         for key, creation_time in meta_cache_items.items())
+                    )
+                    conn.executemany(
+                        'UPDATE meta_cache SET used_at = ? '
+                        'WHERE name = ? AND size = ? AND mtime_ns = ?',
+                        ((used_at, *key) for key in self.meta_cache_hits)
+                    )
+                    conn.execute('DELETE FROM meta_cache WHERE used_at < ?',
+                                 (used_at - self.META_CACHE_MAX_AGE,))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f'无法保存媒体文件缓存: {e}')
 
     @staticmethod
-    def get_media_file_metadata(src_media_file: Path) -> Optional[Dict]:
+    def get_meta_cache_key(media_file: Path) -> Tuple[str, int, int]:
+        """
+        构建媒体文件缓存键(name, size, mtime_ns)，不包含目录，源目录移动或重新导入后仍可命中
+        :param media_file: Path
+        :return: Tuple
+        """
+
+        media_file_stat = media_file.stat()
+        return media_file.name, media_file_stat.st_size, media_file_stat.st_mtime_ns
+
+    def walk_media_file_items(self,
+                              media_dir: str,
+                              skip_dir_stat: Optional[os.stat_result] = None) -> Iterator[Path]:
+        """
+        递归遍历目录中支持的媒体文件，复用目录项自带的文件类型信息，避免逐个文件stat
+        :param media_dir: string
+        :param skip_dir_stat: 需要跳过的目录的stat结果，None表示不跳过
+        :return: Iterator[Path]
+        """
+
+        try:
+            with os.scandir(media_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if skip_dir_stat and os.path.samestat(entry.stat(follow_symlinks=False),
+                                                              skip_dir_stat):
+                            continue
+                        yield from self.walk_media_file_items(entry.path, skip_dir_stat)
+                    elif (entry.is_file(follow_symlinks=False) and
+                          os.path.splitext(entry.name)[1].lower() in self.SUFFIX_SET):
+                        yield Path(entry.path)
+        except OSError as e:
+            logger.warning(f'无法遍历目录 "{media_dir}": {e}')
+
+    def get_supported_media_file_items(self) -> Iterator[Path]:
+        """
+        获取支持的媒体文件迭代器，边遍历边处理，不在内存中保存完整列表
+        :return: Iterator[Path]
+        """
+
+        # 目的目录位于源目录之下时跳过目的目录，避免边遍历边移动时再次遍历到已整理的文件；
+        # 源目录与目的目录相同时无法跳过，由rename_media_file识别已位于目的路径的文件
+        skip_dir_stat = None
+        if not os.path.samefile(self.src_media_dir, self.dst_media_dir):
+            skip_dir_stat = os.stat(self.dst_media_dir)
+
+        return self.walk_media_file_items(str(self.src_media_dir), skip_dir_stat)
+
+    @classmethod
+    def get_media_file_metadata_fingerprint(cls, media_file_obj: BinaryIO) -> Tuple[int, bytes]:
+        """
+        计算用于Metadata缓存的媒体文件指纹
+        (文件大小, 文件头和文件尾各METADATA_FINGERPRINT_SIZE字节的blake2b摘要)
+        MP4/MOV等格式的时间信息可能位于文件尾部的moov中，只取文件头不足以区分不同文件
+        :param media_file_obj: BinaryIO
+        :return: Tuple of (size, digest)
+        """
+
+        size = os.fstat(media_file_obj.fileno()).st_size
+        fingerprint_hash = hashlib.blake2b(media_file_obj.read(cls.METADATA_FINGERPRINT_SIZE),
+                                           digest_size=16)
+        if size > cls.METADATA_FINGERPRINT_SIZE:
+            media_file_obj.seek(max(size - cls.METADATA_FINGERPRINT_SIZE,
+                                    cls.METADATA_FINGERPRINT_SIZE))
+            fingerprint_hash.update(media_file_obj.read(cls.METADATA_FINGERPRINT_SIZE))
+        return size, fingerprint_hash.digest()
+
+    @classmethod
+    def get_media_file_metadata(cls, src_media_file: Path) -> Optional[Dict]:
         """
         获取媒体文件的Metadata数据，以字典格式返回
+        手机备份中常有完全相同的重复文件，按文件指纹缓存最近的解析结果，避免hachoir重复解析
         :param src_media_file: Path
         :return: Dict or None
         """
 
-        media_file_parser = createParser(str(src_media_file))
-        if not media_file_parser:
-            logger.warning(f'无法创建媒体文件解析器: {str(src_media_file)}')
+        try:
+            # 无缓冲读取，每次read对应一次系统调用；计算指纹和解析Metadata复用同一个文件描述符
+            with open(src_media_file, 'rb', buffering=0) as f:
+                # 计算指纹和hachoir解析都只随机读取少量数据，关闭内核预读，避免大块顺序预读挤占页缓存
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_RANDOM)
+
+                try:
+                    metadata_fingerprint = cls.get_media_file_metadata_fingerprint(f)
+                    if metadata_fingerprint in MEDIA_FILE_METADATA_CACHE:
+                        MEDIA_FILE_METADATA_CACHE.move_to_end(metadata_fingerprint)
+                        return MEDIA_FILE_METADATA_CACHE[metadata_fingerprint]
+
+                    media_file_metadata_dict = cls.parse_media_file_metadata(f, src_media_file)
+                finally:
+                    # 解除映射后再释放已读入的页缓存，已映射的页面不会被DONTNEED回收
+                    if hasattr(os, 'posix_fadvise'):
+                        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError as e:
+            logger.warning(f'无法读取媒体文件: {str(src_media_file)}, {e}')
             return None
 
-        with media_file_parser:
-            try:
-                media_file_metadata_raw = extractMetadata(media_file_parser)
-                if not media_file_metadata_raw:
-                    logger.warning(f'无法提取媒体文件元数据: {str(src_media_file)}')
+        MEDIA_FILE_METADATA_CACHE[metadata_fingerprint] = media_file_metadata_dict
+        if len(MEDIA_FILE_METADATA_CACHE) > cls.METADATA_CACHE_SIZE:
+            MEDIA_FILE_METADATA_CACHE.popitem(last=False)
+
+        return media_file_metadata_dict
+
+    @staticmethod
+    def parse_media_file_metadata(media_file_obj: BinaryIO, src_media_file: Path) -> Optional[Dict]:
+        """
+        使用hachoir解析媒体文件的Metadata数据，以字典格式返回
+        通过mmap把文件交给hachoir解析，只有实际访问到的部分(通常是文件头)才会从磁盘读取
+        :param media_file_obj: BinaryIO
+        :param src_media_file: Path
+        :return: Dict or None
+        """
+
+        try:
+            with mmap.mmap(media_file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mmap, 'MADV_RANDOM'):
+                    mm.madvise(mmap.MADV_RANDOM)
+
+                media_file_stream = InputIOStream(
+                    mm,
+                    source=f'file:{str(src_media_file)}',
+                    tags=[('filename', str(src_media_file))]
+                )
+                media_file_parser = guessParser(media_file_stream)
+                if not media_file_parser:
+                    logger.warning(f'无法创建媒体文件解析器: {str(src_media_file)}')
                     return None
-                return media_file_metadata_raw.exportDictionary()
-            except (ValueError, TypeError) as e:  # 捕获特定的异常
-                logger.warning(f'元数据提取错误: {e}')
-                return None
+
+                with media_file_parser:
+                    try:
+                        media_file_metadata_raw = extractMetadata(media_file_parser)
+                        if not media_file_metadata_raw:
+                            logger.warning(f'无法提取媒体文件元数据: {str(src_media_file)}')
+                            return None
+                        return media_file_metadata_raw.exportDictionary()
+                    except (ValueError, TypeError) as e:  # 捕获特定的异常
+                        logger.warning(f'元数据提取错误: {e}')
+                        return None
+        except (OSError, ValueError) as e:  # 空文件无法mmap，会抛出ValueError
+            logger.warning(f'无法读取媒体文件: {str(src_media_file)}, {e}')
+            return None
 
     @staticmethod
     def get_media_file_mtime(src_media_file: Path) -> datetime:
@@ -95,22 +345,21 @@ class MediaFileFinisher:
         media_file_creation_time = datetime.fromtimestamp(media_file_mtime_timestamp)
         return media_file_creation_time
 
-    @staticmethod
-    def parse_media_time_string(time_string: str) -> Optional[datetime]:
+    @classmethod
+    def parse_media_time_string(cls, time_string: str) -> Optional[datetime]:
         """
         解析从媒体文件Metadata中获取的时间字符串
         :param time_string: string
         :return: datetime object or None
         """
 
-        datetime_formats = [
-            '%Y-%m-%d %H:%M:%S',
-            '%Y/%m/%d %H:%M:%S',
-            '%Y-%m-%d %H:%M:%S.%f',
-            '%Y/%m/%d %H:%M:%S.%f'
-        ]
+        # 优先使用C实现的ISO格式解析，比strptime快得多
+        try:
+            return datetime.fromisoformat(time_string.replace('/', '-', 2))
+        except ValueError:
+            pass
 
-        for datetime_format in datetime_formats:
+        for datetime_format in cls.DATETIME_FORMATS:
             try:
                 datetime_obj = datetime.strptime(time_string, datetime_format)
                 return datetime_obj
@@ -119,68 +368,82 @@ class MediaFileFinisher:
 
         return None  # 所有格式都尝试失败后返回 None
 
-    def get_media_file_creation_time(self, src_media_file: Path) -> datetime:
+    @staticmethod
+    def get_media_file_name_time(src_media_file: Path) -> Optional[datetime]:
         """
-        获取媒体文件创建时间
+        从媒体文件名中解析创建时间，支持微信导出文件名和本脚本格式化过的文件名
         :param src_media_file: Path
-        :return: datetime
+        :return: datetime object or None
         """
 
-        media_file_metadata_dict = self.get_media_file_metadata(src_media_file)
+        src_media_file_stem: str = src_media_file.stem
+        media_file_creation_time = None
 
-        # 如果媒体文件Metadata数据获取失败
-        if not media_file_metadata_dict:
-            src_media_file_stem: str = PurePath(src_media_file).stem
-
-            # 如果是微信导出的媒体文件，从文件名构建文件创建时间
+        try:
+            # 如果是微信导出的媒体文件，文件名末尾是13位毫秒级时间戳
             if src_media_file_stem.startswith(('mmexport', 'wx_camera')):
-                media_file_creation_time_timestamp = int(src_media_file_stem[-12:]) / 1000
-                # 将创建时间转换为datetime对象
+                media_file_creation_time_timestamp = int(src_media_file_stem[-13:]) / 1000
                 media_file_creation_time = datetime.fromtimestamp(
                     media_file_creation_time_timestamp
                 )
-                return media_file_creation_time
-
-            # 如果已经通过本脚本或者手工格式化过文件名，从文件名构建文件创建时间
-            if src_media_file_stem.startswith(('IMG_', 'VID_')) and len(src_media_file_stem) >= 19:
-                try:
-                    media_file_creation_time_str = src_media_file_stem[4:19]
-                    media_file_creation_time = datetime.strptime(
-                        media_file_creation_time_str, '%Y%m%d_%H%M%S'
-                    )
-                    return media_file_creation_time
-                except ValueError:
-                    logger.warning(f'无法从文件名构建文件创建时间: {str(src_media_file)}')
-
-            # 如果上面两种方式构建失败，则以文件的mtime属性作为文件创建时间
-            return self.get_media_file_mtime(src_media_file)
-
-        # 如果媒体文件Metadata数据获取成功
-        if media_file_metadata_dict:
-            # 尝试获取Metadata的"Date-time original"
-            media_file_creation_time_str = (
-                media_file_metadata_dict.get('Metadata', {}).get('Date-time original') or
-                media_file_metadata_dict.get('Metadata', {}).get('Creation date')
-            )
 
-            if not media_file_creation_time_str:
-                logger.warning(
-                    f'媒体文件{str(src_media_file)}元数据没有"Date-time original"或"Creation date"属性'
+            # 如果已经通过本脚本或者手工格式化过文件名，文件名中是"年月日_时分秒"字符串
+            elif (src_media_file_stem.startswith(('IMG_', 'VID_')) and
+                  len(src_media_file_stem) >= 19):
+                media_file_creation_time = datetime.strptime(
+                    src_media_file_stem[4:19], '%Y%m%d_%H%M%S'
                 )
-                return self.get_media_file_mtime(src_media_file)
+        except (ValueError, OverflowError, OSError):
+            logger.warning(f'无法从文件名构建文件创建时间: {str(src_media_file)}')
+            return None
 
-            # 解析通过媒体文件Metadata获取的时间字符串
-            media_file_creation_time = self.parse_media_time_string(media_file_creation_time_str)
-            if not media_file_creation_time:
-                return self.get_media_file_mtime(src_media_file)
+        # 文件名中的时间不合理时，视为无法从文件名获取
+        if media_file_creation_time and media_file_creation_time.year < 2000:
+            return None
 
-            # 处理从个别手机APP导出的媒体文件Metadata数据严重不合理的情况
-            if media_file_creation_time.year < 2000:
-                return self.get_media_file_mtime(src_media_file)
+        return media_file_creation_time
 
+    @classmethod
+    def get_media_file_creation_time(cls, src_media_file: Path) -> datetime:
+        """
+        获取媒体文件创建时间
+        :param src_media_file: Path
+        :return: datetime
+        """
+
+        # 优先从文件名获取创建时间，文件名匹配时无需启动hachoir解析Metadata
+        media_file_creation_time = cls.get_media_file_name_time(src_media_file)
+        if media_file_creation_time:
             return media_file_creation_time
 
-        return self.get_media_file_mtime(src_media_file)
+        media_file_metadata_dict = cls.get_media_file_metadata(src_media_file)
+
+        # 如果媒体文件Metadata数据获取失败，则以文件的mtime属性作为文件创建时间
+        if not media_file_metadata_dict:
+            return cls.get_media_file_mtime(src_media_file)
+
+        # 尝试获取Metadata的"Date-time original"
+        media_file_creation_time_str = (
+            media_file_metadata_dict.get('Metadata', {}).get('Date-time original') or
+            media_file_metadata_dict.get('Metadata', {}).get('Creation date')
+        )
+
+        if not media_file_creation_time_str:
+            logger.warning(
+                f'媒体文件{str(src_media_file)}元数据没有"Date-time original"或"Creation date"属性'
+            )
+            return cls.get_media_file_mtime(src_media_file)
+
+        # 解析通过媒体文件Metadata获取的时间字符串
+        media_file_creation_time = cls.parse_media_time_string(media_file_creation_time_str)
+        if not media_file_creation_time:
+            return cls.get_media_file_mtime(src_media_file)
+
+        # 处理从个别手机APP导出的媒体文件Metadata数据严重不合理的情况
+        if media_file_creation_time.year < 2000:
+            return cls.get_media_file_mtime(src_media_file)
+
+        return media_file_creation_time
 
     @staticmethod
     def is_duplicated(file1: Path, file2: Path) -> bool:
@@ -191,136 +454,279 @@ class MediaFileFinisher:
         :return: bool
         """
 
-        # 两个文件名为 file1 和 file2，将它们的内容读取到内存中
-        with open(file1, 'rb') as f1, open(file2, 'rb') as f2:
-            f1_content = f1.read()
-            f2_content = f2.read()
+        # 逐块比较文件内容，大小不同或遇到第一个不同的块即返回，无需计算哈希值
+        return filecmp.cmp(str(file1), str(file2), shallow=False)
 
-        # 计算两个文件的 md5 哈希值
-        f1_md5 = hashlib.md5(f1_content).hexdigest()
-        f2_md5 = hashlib.md5(f2_content).hexdigest()
+    @classmethod
+    def get_file_fingerprint(cls, media_file: Path) -> bytes:
+        """
+        计算文件指纹(文件头FINGERPRINT_PREFIX_SIZE字节的blake2b摘要)
+        :param media_file: Path
+        :return: bytes
+        """
 
-        return f1_md5 == f2_md5
+        with open(media_file, 'rb') as f:
+            prefix = f.read(cls.FINGERPRINT_PREFIX_SIZE)
+        return hashlib.blake2b(prefix, digest_size=16).digest()
 
-    def rename_media_file(self,
+    def get_cached_file_fingerprint(self, media_file: Path) -> bytes:
+        """
+        获取文件指纹，同一文件只读取计算一次
+        :param media_file: Path
+        :return: bytes
+        """
+
+        file_fingerprint = self.file_fingerprints.get(media_file)
+        if file_fingerprint is None:
+            file_fingerprint = self.get_file_fingerprint(media_file)
+            self.file_fingerprints[media_file] = file_fingerprint
+        return file_fingerprint
+
+    def is_dst_duplicated(self,
                           src_media_file: Path,
-                          stats_ns: Namespace,
-                          media_file_name_duplicated: Any,
-                          media_file_duplicated_removed: Any,
-                          lock: Any) -> None:
+                          src_file_stat: os.stat_result,
+                          dst_media_file: Path,
+                          dst_file_stat: os.stat_result) -> bool:
         """
-        执行媒体文件重命名
+        判断源文件与目的文件是否重复，先比较调用方已获取的文件大小，大小一致时才读取比较文件指纹，
+        指纹一致时才逐块比较完整内容
         :param src_media_file: Path
-        :param stats_ns
-        :param media_file_name_duplicated
-        :param media_file_duplicated_removed
-        :param lock
+        :param src_file_stat: os.stat_result
+        :param dst_media_file: Path
+        :param dst_file_stat: os.stat_result
+        :return: bool
+        """
+
+        if src_file_stat.st_size != dst_file_stat.st_size:
+            return False
+
+        if (self.get_cached_file_fingerprint(src_media_file) !=
+                self.get_cached_file_fingerprint(dst_media_file)):
+            return False
+
+        return self.is_duplicated(src_media_file, dst_media_file)
+
+    def get_dst_dir_index(self, dst_media_file_dir: Path) -> Dict[str, str]:
+        """
+        获取目的目录中已有文件名的索引，首次访问时创建目录或通过listdir构建，
+        之后同一目录的文件不再需要检查目录是否存在
+        以casefold后的文件名为键判断重名，兼容APFS、NTFS等大小写不敏感的文件系统，避免漏判重名导致覆盖；
+        值为磁盘上的实际文件名，大小写敏感的文件系统上比较文件时使用
+        :param dst_media_file_dir: Path
+        :return: Dict of {casefold_name: name}
+        """
+
+        dst_dir_index = self.dst_dir_index.get(dst_media_file_dir)
+        if dst_dir_index is None:
+            try:
+                dst_media_file_dir.mkdir(parents=True)
+                dst_dir_index = {}
+            except FileExistsError:
+                dst_dir_index = {name.casefold(): name for name in os.listdir(dst_media_file_dir)}
+            self.dst_dir_index[dst_media_file_dir] = dst_dir_index
+        return dst_dir_index
+
+    def discard_dst_dir_index(self, media_file: Path) -> None:
+        """
+        从目的目录文件名索引中移除已移走或已删除的文件
+        :param media_file: Path
         :return: None
         """
 
-        media_file_creation_time = self.get_media_file_creation_time(src_media_file)
-        if media_file_creation_time is None:
-            media_file_creation_time = self.get_media_file_mtime(src_media_file)
+        dst_dir_index = self.dst_dir_index.get(media_file.parent)
+        # 大小写敏感的文件系统上可能存在仅大小写不同的文件，只移除索引中确实指向该文件的条目
+        if dst_dir_index and dst_dir_index.get(media_file.name.casefold()) == media_file.name:
+            del dst_dir_index[media_file.name.casefold()]
+
+    @staticmethod
+    def copy_media_file(src_media_file: Path, dst_media_file: Path) -> None:
+        """
+        跨文件系统复制媒体文件，优先使用copy_file_range在内核中完成数据复制，并保留mtime等属性
+        :param src_media_file: Path
+        :param dst_media_file: Path
+        :return: None
+        """
 
-        # 获取媒体文件创建时间"年月日"字符串，用于构建目的目录名
-        src_media_file_creation_date = datetime.strftime(media_file_creation_time, '%Y%m%d')
+        # 以独占方式创建目的文件，避免覆盖已存在的文件
+        with open(src_media_file, 'rb') as fsrc, open(dst_media_file, 'xb') as fdst:
+            try:
+                copied = 0
+                size = os.fstat(fsrc.fileno()).st_size
+                if hasattr(os, 'copy_file_range'):
+                    try:
+                        while copied < size:
+                            n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+                            if n == 0:
+                                break
+                            copied += n
+                    except OSError:
+                        # 部分内核或文件系统不支持跨文件系统的copy_file_range，尚未复制数据时回退到普通复制
+                        if copied:
+                            raise
+
+                if not copied:
+                    shutil.copyfileobj(fsrc, fdst)
+
+                # copy_file_range提前返回0等情况会得到不完整的目的文件，之后源文件会被删除，必须确认复制完整
+                copied = os.fstat(fdst.fileno()).st_size
+                if copied != size:
+                    raise OSError(errno.EIO,
+                                  f'复制不完整: 已复制{copied}字节，源文件{size}字节',
+                                  str(dst_media_file))
+            except BaseException:
+                # 复制失败时删除不完整的目的文件
+                fdst.close()
+                dst_media_file.unlink()
+                raise
+
+        shutil.copystat(src_media_file, dst_media_file)
+
+    def move_media_file(self, src_media_file: Path, dst_media_file: Path) -> None:
+        """
+        移动重命名媒体文件，并同步更新目的目录文件名索引
+        源目录与目的目录不在同一文件系统时，改为复制后删除源文件
+        目的文件已存在时抛出FileExistsError，任何情况下都不覆盖已存在的文件
+        :param src_media_file: Path
+        :param dst_media_file: Path
+        :return: None
+        """
 
-        # 获取媒体文件创建时间的"年月日_时分秒"字符串，用于构建目的文件名
-        src_media_file_creation_time = datetime.strftime(media_file_creation_time, '%Y%m%d_%H%M%S')
+        # 通过硬链接或复制创建目的文件后，还需要删除源文件
+        src_media_file_unlinked = True
+        try:
+            if os.name == 'nt':
+                # Windows上os.rename在目的文件已存在时抛出FileExistsError，不会覆盖
+                os.rename(src_media_file, dst_media_file)
+            else:
+                # POSIX上rename会静默覆盖已存在的目的文件，改用硬链接后删除源文件，目的文件已存在时link失败
+                os.link(src_media_file, dst_media_file)
+                src_media_file_unlinked = False
+        except FileExistsError:
+            raise
+        except OSError as e:
+            if e.errno == errno.EXDEV:
+                self.copy_media_file(src_media_file, dst_media_file)
+                src_media_file_unlinked = False
+            elif e.errno in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK):
+                # 文件系统不支持硬链接(例如FAT、exFAT)时回退到rename，rename前再次确认目的文件不存在
+                if dst_media_file.exists():
+                    raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST),
+                                          str(dst_media_file)) from e
+                os.rename(src_media_file, dst_media_file)
+            else:
+                raise
 
-        # 获取媒体文件的后缀名
-        src_media_file_suffix = Path(src_media_file).suffix
+        if not src_media_file_unlinked:
+            try:
+                os.unlink(src_media_file)
+            except BaseException:
+                # 源文件删除失败时删除刚创建的目的文件，避免同一文件同时出现在源路径和目的路径
+                os.unlink(dst_media_file)
+                raise
+
+        self.discard_dst_dir_index(src_media_file)
+        self.dst_dir_index[dst_media_file.parent][dst_media_file.name.casefold()] = \
+            dst_media_file.name
+        self.file_fingerprints.pop(src_media_file, None)
+
+    def remove_media_file(self, src_media_file: Path) -> None:
+        """
+        删除重复的媒体文件，并同步更新目的目录文件名索引
+        :param src_media_file: Path
+        :return: None
+        """
 
-        # 设置媒体文件目录名和文件名的默认值，避免出现空值
-        dst_media_file_dir_name = 'UNKNOWN'
-        dst_media_file_name = 'UNKNOWN'
+        src_media_file.unlink()
+        self.discard_dst_dir_index(src_media_file)
+        self.file_fingerprints.pop(src_media_file, None)
 
-        # 构建图片文件的目的目录名和文件名
-        if src_media_file_suffix.lower() in self.IMAGE_SUFFIX_FILTER:
-            dst_media_file_dir_name = f'PHOTO_{src_media_file_creation_date}'
-            dst_media_file_name = (
-                f'IMG_{src_media_file_creation_time}'
-                f'{src_media_file_suffix.lower()}'
-            )
+    def rename_media_file(self,
+                          src_media_file: Path,
+                          media_file_creation_time: datetime) -> Optional[RenameResult]:
+        """
+        执行媒体文件重命名，只在重命名线程中调用，处理结果通过返回值汇总
+        :param src_media_file: Path
+        :param media_file_creation_time: datetime
+        :return: RenameResult，媒体文件已位于目的路径时返回None
+        """
 
-            # 图片文件统计计数
-            with lock:
-                stats_ns.image_file_nums += 1
+        # 获取媒体文件创建时间的"年月日_时分秒"字符串，用于构建目的文件名，其前8位"年月日"用于构建目的目录名
+        src_media_file_creation_time = media_file_creation_time.strftime('%Y%m%d_%H%M%S')
+        src_media_file_creation_date = src_media_file_creation_time[:8]
 
-        # 构建视频文件的目的目录名和文件名
-        if src_media_file_suffix.lower() in self.VIDEO_SUFFIX_FILTER:
-            dst_media_file_dir_name = f'VIDEO_{src_media_file_creation_date}'
-            dst_media_file_name = (
-                f'VID_{src_media_file_creation_time}'
-                f'{src_media_file_suffix.lower()}'
-            )
+        # 获取媒体文件的小写后缀名，并查表得到媒体文件类型、目的目录名前缀和文件名前缀
+        src_media_file_suffix = src_media_file.suffix.lower()
+        media_file_kind, dst_media_file_dir_prefix, dst_media_file_name_prefix = \
+            self.SUFFIX_NAME_PREFIX.get(src_media_file_suffix, self.UNKNOWN_NAME_PREFIX)
 
-            # 视频文件统计计数
-            with lock:
-                stats_ns.video_file_nums += 1
+        # 构建媒体文件的目的目录名和文件名
+        dst_media_file_dir_name = f'{dst_media_file_dir_prefix}_{src_media_file_creation_date}'
+        dst_media_file_stem = f'{dst_media_file_name_prefix}_{src_media_file_creation_time}'
+        dst_media_file_name = f'{dst_media_file_stem}{src_media_file_suffix}'
 
-        # 构建完整的媒体文件目的目录路径Path对象，并自动创建
+        # 构建完整的媒体文件目的目录路径Path对象，目录在首次获取文件名索引时自动创建
         dst_media_file_dir = Path.joinpath(self.dst_media_dir, dst_media_file_dir_name)
-        if not dst_media_file_dir.exists():
-            dst_media_file_dir.mkdir()
-
-        # 构建完整的媒体文件目的路径Path对象
-        dst_media_file = Path.joinpath(
-            self.dst_media_dir, dst_media_file_dir_name, dst_media_file_name)
 
-        # 如果媒体文件目的路径Path对象不存在，则直接执行移动重命名
-        if not dst_media_file.exists():
-            src_media_file.rename(dst_media_file)
-            logger.info(f'完成 "{str(src_media_file)}" 到 "{str(dst_media_file)}" 的移动重命名')
+        dst_dir_index = self.get_dst_dir_index(dst_media_file_dir)
 
-        # 如果源文件与目的文件完全一致，说明文件重复，直接删除源文件
-        elif dst_media_file.exists() and self.is_duplicated(src_media_file, dst_media_file):
-            src_media_file.unlink()
+        # 出现重名时才获取源文件stat，与各个候选目的文件比较时复用
+        src_file_stat = None
 
-            # 媒体文件重复统计计数
-            with lock:
-                stats_ns.media_file_duplicated_removed_nums += 1
+        i = 0
+        while True:
+            # 如果媒体文件目的路径Path对象存在，也即出现重复文件名，则在文件名后加一个序号，再执行执行重命名
+            if i:
+                dst_media_file_name = f'{dst_media_file_stem}_{i}{src_media_file_suffix}'
 
-            # 媒体文件重复删除列表
-            with lock:
-                media_file_duplicated_removed.append(str(src_media_file))
+            # 如果重复文件名出现多次，则每次出现加一个重复序号，直到不出现为止，避免错误覆盖导致文件丢失
+            existing_media_file_name = dst_dir_index.get(dst_media_file_name.casefold())
+            if existing_media_file_name is not None:
+                # 媒体文件已经位于目的路径(例如源目录与目的目录相同时再次遍历到已整理的文件)，无需处理；
+                # 文件名仅大小写不同(例如后缀名为.JPG)时也视为已位于目的路径，避免重命名为带序号的文件名
+                if (src_media_file.parent == dst_media_file_dir and
+                        src_media_file.name.casefold() == dst_media_file_name.casefold()):
+                    return None
 
-        # 如果媒体文件目的路径Path对象存在，也即出现重复文件名，则在文件名后加一个序号，再执行执行重命名
-        else:
-            i = 0
-            dst_media_file_stem: str = PurePath(dst_media_file).stem
-            while True:
-                i += 1
-                dst_media_file_name = f'{dst_media_file_stem}_{i}{src_media_file_suffix.lower()}'
-                dst_media_file = Path.joinpath(
-                    self.dst_media_dir, dst_media_file_dir_name, dst_media_file_name)
+                if src_file_stat is None:
+                    src_file_stat = os.stat(src_media_file)
 
-                # 如果重复文件名出现多次，则每次出现加一个重复序号，直到不出现为止，避免错误覆盖导致文件丢失
-                if dst_media_file.exists():
-                    if self.is_duplicated(src_media_file, dst_media_file):
-                        src_media_file.unlink()
-                        # 媒体文件重复统计计数
-                        with lock:
-                            stats_ns.media_file_duplicated_removed_nums += 1
-                        # 媒体文件重复删除列表
-                        with lock:
-                            media_file_duplicated_removed.append(str(src_media_file))
-                        break
-                    else:
-                        continue
-                else:
-                    src_media_file.rename(dst_media_file)
-                    logger.info(f'完成 "{str(src_media_file)}" 到 "{str(dst_media_file)}" 的移动重命名')
+                # 与磁盘上的实际文件比较，大小写敏感的文件系统上按目的文件名可能找不到该文件；
+                # 每个候选目的文件只stat一次，同时用于判断是否为同一文件和比较文件大小
+                dst_media_file = Path.joinpath(dst_media_file_dir, existing_media_file_name)
+                try:
+                    dst_file_stat = os.stat(dst_media_file)
+                except FileNotFoundError:
+                    # 目的文件已被其他程序删除，索引已过期，仍按重名处理，避免覆盖
+                    i += 1
+                    continue
+
+                # 按设备号和inode判断是否为同一文件，不受路径写法影响
+                if os.path.samestat(src_file_stat, dst_file_stat):
+                    return None
 
-                    # 媒体文件重名统计计数
-                    with lock:
-                        stats_ns.media_file_name_duplicated_nums += 1
+                # 如果源文件与目的文件完全一致，说明文件重复，直接删除源文件
+                if self.is_dst_duplicated(src_media_file, src_file_stat,
+                                          dst_media_file, dst_file_stat):
+                    self.remove_media_file(src_media_file)
+                    return RenameResult(media_file_kind, duplicated_removed=str(src_media_file))
 
-                    # 媒体文件重名列表
-                    with lock:
-                        media_file_name_duplicated.append(str(dst_media_file))
+                i += 1
+                continue
 
-                    break
+            # 如果媒体文件目的路径Path对象不存在，则构建完整的媒体文件目的路径Path对象，直接执行移动重命名
+            dst_media_file = Path.joinpath(dst_media_file_dir, dst_media_file_name)
+            try:
+                self.move_media_file(src_media_file, dst_media_file)
+            except FileExistsError:
+                # 目的文件在构建索引之后才出现(例如被其他程序写入)，补充到索引后按重名处理
+                dst_dir_index[dst_media_file_name.casefold()] = dst_media_file_name
+                continue
+
+            return RenameResult(
+                media_file_kind,
+                moved=(str(src_media_file), str(dst_media_file)),
+                name_duplicated=str(dst_media_file) if i else None
+            )
 
     @staticmethod
     def printf(text, *colors) -> None:
@@ -344,9 +750,9 @@ class MediaFileFinisher:
         sys.stdout.write(format_text)
 
     def print_stats_data(self,
-                         stats_ns,
-                         media_file_name_duplicated,
-                         media_file_duplicated_removed
+                         stats: Dict[str, int],
+                         media_file_name_duplicated: List[str],
+                         media_file_duplicated_removed: List[str]
                          ) -> None:
         """
         打印统计数据
@@ -354,11 +760,11 @@ class MediaFileFinisher:
         """
         self.printf('-' * 20, 'BOLD')
         self.printf('批量重命名媒体文件已完成，统计信息如下:', 'BLUE', 'BOLD')
-        self.printf(f'媒体文件总数: {stats_ns.media_file_nums}', 'GREEN')
-        self.printf(f'图片文件总数: {stats_ns.image_file_nums}', 'GREEN')
-        self.printf(f'视频文件总数: {stats_ns.video_file_nums}', 'GREEN')
-        self.printf(f'媒体文件重名数: {stats_ns.media_file_name_duplicated_nums}', 'GREEN')
-        self.printf(f'媒体文件重复删除数: {stats_ns.media_file_duplicated_removed_nums}', 'GREEN')
+        self.printf(f'媒体文件总数: {stats["media_file_nums"]}', 'GREEN')
+        self.printf(f'图片文件总数: {stats["image_file_nums"]}', 'GREEN')
+        self.printf(f'视频文件总数: {stats["video_file_nums"]}', 'GREEN')
+        self.printf(f'媒体文件重名数: {stats["media_file_name_duplicated_nums"]}', 'GREEN')
+        self.printf(f'媒体文件重复删除数: {stats["media_file_duplicated_removed_nums"]}', 'GREEN')
 
         if media_file_name_duplicated:
             self.printf('-' * 20, 'BOLD')
@@ -372,51 +778,202 @@ class MediaFileFinisher:
             for media_file in media_file_duplicated_removed:
                 self.printf(media_file, 'RED')
 
+    @staticmethod
+    def is_media_file_moved_logged() -> bool:
+        """
+        判断移动重命名日志是否会被输出，hachoir的logger在quiet或非verbose模式下丢弃INFO级别日志，
+        只有指定--verbose时才会输出
+        :return: bool
+        """
+
+        return not config.quiet and config.verbose
+
+    @classmethod
+    def log_media_file_moved(cls, media_file_moved: List[Tuple[str, str]]) -> None:
+        """
+        批量输出媒体文件移动重命名日志，避免逐个文件写日志
+        :param media_file_moved: List of (src_media_file, dst_media_file)
+        :return: None
+        """
+
+        if not media_file_moved or not cls.is_media_file_moved_logged():
+            return
+
+        logger.info('\n'.join(
+            f'完成 "{src_media_file}" 到 "{dst_media_file}" 的移动重命名'
+            for src_media_file, dst_media_file in media_file_moved
+        ))
+
+    def produce_media_file_creation_times(self,
+                                          executor: ProcessPoolExecutor,
+                                          process_nums: int,
+                                          rename_queue: queue.Queue) -> None:
+        """
+        遍历源目录，缓存未命中的媒体文件按批次提交到进程池解析创建时间，
+        批次大小根据进程池中未完成的批次数在MIN_BATCH_SIZE和MAX_BATCH_SIZE之间自适应调整
+        :param executor: ProcessPoolExecutor
+        :param process_nums: int
+        :param rename_queue: queue.Queue
+        :return: None
+        """
+
+        batch_size = self.MIN_BATCH_SIZE
+        batch: List[Path] = []
+        pending: List[Future] = []
+
+        # sqlite连接只能在创建它的线程中使用，因此在生产者线程中打开缓存数据库
+        meta_cache_conn = self.load_meta_cache()
+        try:
+            for src_media_file in self.get_supported_media_file_items():
+                self.discovered_media_file_nums += 1
+
+                # 文件名中已包含创建时间(例如已整理过的文件)或缓存命中的媒体文件无需解析Metadata，
+                # 直接交给重命名线程，目的文件已存在时由重命名线程按大小和内容判断是否重复
+                media_file_creation_time = self.get_media_file_name_time(src_media_file)
+                if not media_file_creation_time and meta_cache_conn:
+                    meta_cache_key = self.get_meta_cache_key(src_media_file)
+                    media_file_creation_time_str = self.get_meta_cache(meta_cache_conn,
+                                                                       meta_cache_key)
+                    if media_file_creation_time_str:
+                        self.meta_cache_hits.append(meta_cache_key)
+                        media_file_creation_time = datetime.fromisoformat(
+                            media_file_creation_time_str)
+
+                if media_file_creation_time:
+                    rename_queue.put([(src_media_file, None, media_file_creation_time)])
+                    continue
+
+                batch.append(src_media_file)
+                if len(batch) < batch_size:
+                    continue
+
+                future = executor.submit(get_media_file_creation_time_worker, batch)
+                rename_queue.put(future)
+                batch = []
+
+                # 未完成的批次多于进程数时各进程均已满载，增大批次以摊薄进程间通信开销；
+                # 少于进程数时存在空闲进程，减小批次以尽快交付
+                pending = [f for f in pending if not f.done()]
+                pending.append(future)
+                if len(pending) > process_nums:
+                    batch_size = min(batch_size * 2, self.MAX_BATCH_SIZE)
+                elif len(pending) < process_nums:
+                    batch_size = max(batch_size // 2, self.MIN_BATCH_SIZE)
+
+            if batch:
+                rename_queue.put(executor.submit(get_media_file_creation_time_worker, batch))
+        except BaseException as e:  # pylint: disable=broad-except
+            # 生产者线程中的异常不会传递到主线程，放入队列由重命名线程重新抛出，避免遍历被静默中断
+            rename_queue.put(e)
+        else:
+            rename_queue.put(None)
+        finally:
+            if meta_cache_conn:
+                meta_cache_conn.close()
+
     def finish_media_file(self) -> None:
         """
         批量执行媒体文件整理
         :return: None
         """
 
-        supported_src_media_file_items = self.get_supported_media_file_items()
-        supported_src_media_file_nums = len(supported_src_media_file_items)
+        stats = {
+            'media_file_nums': 0,
+            'image_file_nums': 0,
+            'video_file_nums': 0,
+            'media_file_name_duplicated_nums': 0,
+            'media_file_duplicated_removed_nums': 0,
+        }
+        media_file_name_duplicated: List[str] = []
+        media_file_duplicated_removed: List[str] = []
+        meta_cache_updates: Dict[Tuple[str, int, int], str] = {}
+        media_file_moved: List[Tuple[str, str]] = []
+        # 日志不会输出时不收集移动重命名记录，避免无用的字符串拼接
+        media_file_moved_logged = self.is_media_file_moved_logged()
+
+        self.meta_cache_hits = []
+
+        # 解析Metadata是CPU密集型任务，交给进程池；移动重命名由主线程串行执行，避免文件系统并发问题
+        process_nums = max((os.cpu_count() or 1) - 1, 1)
+        rename_queue: queue.Queue = queue.Queue(maxsize=process_nums * 4)
+        # 不预先遍历统计媒体文件总数，进度条总数随遍历进度增长
+        self.discovered_media_file_nums = 0
+        skipped_media_file_nums = 0
+        with tqdm(total=None) as pbar:
+            with ProcessPoolExecutor(max_workers=process_nums) as executor:
+                producer = threading.Thread(
+                    target=self.produce_media_file_creation_times,
+                    args=(executor, process_nums, rename_queue),
+                    daemon=True
+                )
+                producer.start()
+
+                while True:
+                    rename_items = rename_queue.get()
+                    if rename_items is None:
+                        break
+                    if isinstance(rename_items, BaseException):
+                        raise rename_items
+                    if isinstance(rename_items, Future):
+                        rename_items = rename_items.result()
+
+                    for src_media_file, meta_cache_key, media_file_creation_time in rename_items:
+                        # 只缓存由进程池解析得到的创建时间，文件名时间和缓存命中的条目无需写入
+                        if meta_cache_key:
+                            meta_cache_updates[meta_cache_key] = \
+                                media_file_creation_time.isoformat()
+
+                        result = self.rename_media_file(src_media_file, media_file_creation_time)
+
+                        # 已经位于目的路径的媒体文件不计入统计信息和进度条
+                        if result is None:
+                            skipped_media_file_nums += 1
+                            continue
+
+                        stats['media_file_nums'] += 1
+
+                        if result.kind == 'IMAGE':
+                            stats['image_file_nums'] += 1
+                        elif result.kind == 'VIDEO':
+                            stats['video_file_nums'] += 1
+
+                        if result.duplicated_removed:
+                            stats['media_file_duplicated_removed_nums'] += 1
+                            media_file_duplicated_removed.append(result.duplicated_removed)
+
+                        if result.name_duplicated:
+                            stats['media_file_name_duplicated_nums'] += 1
+                            media_file_name_duplicated.append(result.name_duplicated)
+
+                        if result.moved and media_file_moved_logged:
+                            media_file_moved.append(result.moved)
+                            if len(media_file_moved) >= self.LOG_BATCH_SIZE:
+                                self.log_media_file_moved(media_file_moved)
+                                media_file_moved = []
+
+                        # 只更新进度条总数，由update按tqdm的mininterval节流重绘
+                        pbar.total = self.discovered_media_file_nums - skipped_media_file_nums
+                        pbar.update()
+
+                producer.join()
 
-        if not supported_src_media_file_items:
+                # 遍历结束后进度条总数已确定，重绘一次以显示最终结果
+                pbar.total = self.discovered_media_file_nums - skipped_media_file_nums
+                pbar.refresh()
+
+        self.log_media_file_moved(media_file_moved)
+
+        if not self.discovered_media_file_nums:
             logger.error(f'源目录 "{self.src_media_dir}" 为空，或者没有支持的媒体文件')
             sys.exit(2)
 
-        # 创建进程池和共享变量
-        process_nums = multiprocessing.cpu_count() - 1
-        with multiprocessing.Manager() as manager:
-            stats_ns = manager.Namespace()
-            stats_ns.media_file_nums = supported_src_media_file_nums
-            stats_ns.image_file_nums = 0
-            stats_ns.video_file_nums = 0
-            stats_ns.media_file_name_duplicated_nums = 0
-            stats_ns.media_file_duplicated_removed_nums = 0
-            media_file_name_duplicated = manager.list()
-            media_file_duplicated_removed = manager.list()
-            lock = manager.Lock()
-
-            with tqdm(total=supported_src_media_file_nums) as pbar:
-                with multiprocessing.Pool(process_nums) as pool:
-                    for _, _ in enumerate(pool.imap_unordered(
-                        partial(
-                            self.rename_media_file,
-                            stats_ns=stats_ns,
-                            media_file_name_duplicated=media_file_name_duplicated,
-                            media_file_duplicated_removed=media_file_duplicated_removed,
-                            lock=lock
-                        ),
-                        supported_src_media_file_items
-                    )):
-                        pbar.update()
+        self.save_meta_cache(meta_cache_updates)
 
-            self.print_stats_data(
-                stats_ns,
-                media_file_name_duplicated,
-                media_file_duplicated_removed
-                )
+        self.print_stats_data(
+            stats,
+            media_file_name_duplicated,
+            media_file_duplicated_removed
+            )
 
     @classmethod
     def run(cls):
@@ -435,8 +992,15 @@ class MediaFileFinisher:
                             help='Input media file directory path')
         parser.add_argument('-o', '--output', type=str, required=True,
                             help='output media file directory path')
+        parser.add_argument('-v', '--verbose', action='store_true',
+                            help='output detailed logs, including every moved media file')
         args = parser.parse_args()
 
+        # hachoir的logger默认静默，指定--verbose时输出INFO级别日志，例如移动重命名日志
+        if args.verbose:
+            config.quiet = False
+            config.verbose = True
+
         if not Path(args.input).is_dir():
             logger.error(f'{args.inpout} 不是一个目录.')
             parser.print_help()
@@ -454,6 +1018,26 @@ class MediaFileFinisher:
         cls.printf(f'耗费时间: {time_usage.total_seconds()}s', 'BLUE')
 
 
+# 按指纹缓存的Metadata解析结果，进程池中每个工作进程各自维护
+MEDIA_FILE_METADATA_CACHE: 'OrderedDict[Tuple[int, bytes], Optional[Dict]]' = OrderedDict()
+
+
+def get_media_file_creation_time_worker(
+        batch: List[Path]
+) -> List[Tuple[Path, Tuple[str, int, int], datetime]]:
+    """
+    进程池任务入口，批量解析媒体文件创建时间，并构建用于写入缓存的缓存键
+    :param batch: List of src_media_file
+    :return: List of (src_media_file, meta_cache_key, media_file_creation_time)
+    """
+
+    return [
+        (src_media_file, MediaFileFinisher.get_meta_cache_key(src_media_file),
+         MediaFileFinisher.get_media_file_creation_time(src_media_file))
+        for src_media_file in batch
+    ]
+
+
 if __name__ == '__main__':
 
     MediaFileFinisher.run()